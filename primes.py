@@ -1,20 +1,66 @@
 import random
+from itertools import compress
 
 
-def primes_sieve(limit):
+# Number of odd numbers sieved at once, small enough to stay in CPU cache
+SEGMENT_SIZE = 2 ** 15
+
+# Upper bound of small primes table used for trial division in is_prime
+LOW_PRIMES_LIMIT = 1000
+
+
+def _odd_primes_below(limit):
     """
-    Finding array of prime numbers in range from 0 to limit
-    :param limit: max value of number to find prime
-    :return: list of prime numbers
+    Finding odd prime numbers below limit with simple bytearray sieve
+    :param limit: max value of number to find prime (exclusive)
+    :return: list of odd prime numbers
     """
-    a = [True] * limit
-    a[0] = a[1] = False
-
-    for (i, is_num_prime) in enumerate(a):
-        if is_num_prime:
-            yield i
-            for n in range(i*i, limit, i):
-                a[n] = False
+    # index i of sieve stands for number 2 * i + 1
+    sieve = bytearray([1]) * (limit // 2)
+    if sieve:
+        sieve[0] = 0
+    for i in range(1, (int(limit ** 0.5) + 1) // 2):
+        if sieve[i]:
+            step = 2 * i + 1
+            first = step * step // 2
+            sieve[first::step] = bytes(len(range(first, len(sieve), step)))
+    return [2 * i + 1 for i, is_num_prime in enumerate(sieve) if is_num_prime]
+
+
+def primes_sieve(limit, start=0, segment_size=SEGMENT_SIZE):
+    """
+    Finding prime numbers in range from start to limit with segmented sieve.
+    Only odd numbers are sieved, segment by segment, so memory usage
+    is O(sqrt(limit) + segment_size) instead of O(limit)
+    :param limit: max value of number to find prime (exclusive)
+    :param start: min value of number to find prime (default 0)
+    :param segment_size: count of odd numbers sieved at once
+    :return: generator of prime numbers in ascending order
+    """
+    if start <= 2 < limit:
+        yield 2
+    low = max(start, 3) | 1
+    if low >= limit:
+        return
+
+    base_primes = _odd_primes_below(int((limit - 1) ** 0.5) + 2)
+    while low < limit:
+        high = min(low + 2 * segment_size, limit)
+        # index i of segment stands for number low + 2 * i
+        size = (high - low + 1) // 2
+        segment = bytearray([1]) * size
+        for prime in base_primes:
+            first = prime * prime
+            if first >= high:
+                break
+            if first < low:
+                first = (low + prime - 1) // prime * prime
+            if not first % 2:
+                first += prime
+            index = (first - low) // 2
+            segment[index::prime] = bytes(len(range(index, size, prime)))
+        yield from compress(range(low, high, 2), segment)
+        low = high if high % 2 else high + 1
 
 
 def rabin_miller(num):
@@ -55,11 +101,10 @@ def is_prime(num):
     if num < 2:
         return False
 
-    low_primes = list(primes_sieve(1000))
-    if num in low_primes:
-        return True
+    if num < LOW_PRIMES_LIMIT:
+        return num in _LOW_PRIMES_SET
 
-    for prime in low_primes:
+    for prime in _LOW_PRIMES:
         if not (num % prime):
             return False
 
@@ -67,6 +112,10 @@ def is_prime(num):
     return rabin_miller(num)
 
 
+_LOW_PRIMES = list(primes_sieve(LOW_PRIMES_LIMIT))
+_LOW_PRIMES_SET = set(_LOW_PRIMES)
+
+
 def generate_large_prime(key_size=1024):
     """
     Generating large prime number with defined size of bits
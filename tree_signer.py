@@ -0,0 +1,234 @@
+import json
+import os
+import stat
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from encryption import Encryption
+
+
+def _sign_file(keys, filename):
+    """
+    Signing one file in worker process
+    :param keys: dict of keys to sign file with
+    :param filename: path to file to sign
+    :return: signature of file
+    """
+    # File may be replaced after scan, and opening FIFO or device would block worker
+    if not stat.S_ISREG(os.lstat(filename).st_mode):
+        raise OSError(f"{filename} is not a regular file.")
+    encryption = Encryption()
+    encryption.keys = dict(keys)
+    return encryption.get_signature_private(filename)
+
+
+def load_keys(key_path, key_size=1024):
+    """
+    Reading keys from json key file. If there is no key file,
+    keys are generated and saved to it, so they are reused between runs
+    :param key_path: path to json file with 'p', 'q', 'e' and 'd' keys
+    :param key_size: size of p and q to generate (in bits)
+    :return: Encryption object with all keys set
+    """
+    encryption = Encryption()
+    try:
+        with open(key_path) as stream:
+            keys = json.load(stream)
+    except FileNotFoundError:
+        encryption.set_keys(key_size=key_size)
+        encryption.keys.update(encryption.generate_keys(key_size=key_size))
+        keys = {key: encryption.keys[key] for key in ['p', 'q', 'e', 'd']}
+        # key file includes private key, so only owner can read it
+        with open(os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), 'w') as stream:
+            json.dump(keys, stream)
+        return encryption
+
+    encryption.set_keys(p=keys['p'], q=keys['q'])
+    encryption.keys.update({'e': keys['e'], 'd': keys['d']})
+    if not encryption.check_keys(encryption.keys):
+        raise KeyError("Keys are not valid.")
+    return encryption
+
+
+class TreeSigner:
+    """
+    Signing all files of directory tree and keeping manifest of signatures,
+    so only changed files are signed again
+    """
+
+    def __init__(self, encryption, root, manifest_path, workers=None, key_path=None):
+        """
+        :param encryption: Encryption object with all keys set
+        :param root: path to directory tree to sign
+        :param manifest_path: path to json manifest of signatures
+        :param workers: count of worker processes (default is count of cpus)
+        :param key_path: path to key file, it's never signed if it's inside tree
+        """
+        if not encryption.check_keys(encryption.keys):
+            raise KeyError("Keys are not valid.")
+        self.encryption = encryption
+        self.root = os.path.abspath(root)
+        self.manifest_path = os.path.abspath(manifest_path)
+        self.excluded_paths = {self.manifest_path, f'{self.manifest_path}.tmp'}
+        if key_path:
+            self.excluded_paths.add(os.path.abspath(key_path))
+        self.workers = workers
+        self._executor = None
+        self.public_key = {'e': encryption.keys['e'], 'n': encryption.keys['n']}
+        self.manifest = self.load_manifest()
+        self._is_manifest_changed = False
+
+    def load_manifest(self):
+        """
+        Reading manifest from disk. Manifest signed with other keys is dropped
+        :return: dict of relative path to [size, mtime, signature]
+        """
+        # Manifest is only a cache, so unreadable manifest is the same as missing one
+        try:
+            with open(self.manifest_path) as stream:
+                data = json.load(stream)
+        except (OSError, ValueError):
+            return dict()
+        if not isinstance(data, dict) or data.get('public_key') != self.public_key:
+            return dict()
+        files = data.get('files')
+        if not isinstance(files, dict):
+            return dict()
+        return files
+
+    def save_manifest(self):
+        """
+        Writing manifest to disk atomically: to temporary file first,
+        then replacing old manifest with it
+        :return: None
+        """
+        temp_path = f'{self.manifest_path}.tmp'
+        with open(temp_path, 'w') as stream:
+            json.dump({'public_key': self.public_key, 'files': self.manifest}, stream)
+            stream.flush()
+            os.fsync(stream.fileno())
+        os.replace(temp_path, self.manifest_path)
+        self._is_manifest_changed = False
+
+    def scan(self):
+        """
+        Comparing size and mtime of files in tree with manifest.
+        Only regular files are signed: symlinks, FIFOs, devices and sockets are skipped.
+        Every file of tree is checked, so cost of scan grows with size of tree
+        :return: list of changed or new files, list of removed files,
+            list of files and directories that can't be read (relative paths)
+            and dict of current file stats
+        """
+        stats = dict()
+        failed = []
+
+        def on_walk_error(error):
+            failed.append(os.path.relpath(error.filename, self.root))
+
+        for dir_path, _, file_names in os.walk(self.root, onerror=on_walk_error):
+            for file_name in file_names:
+                path = os.path.join(dir_path, file_name)
+                if path in self.excluded_paths:
+                    continue
+                try:
+                    file_stat = os.lstat(path)
+                except FileNotFoundError:
+                    continue
+                except OSError:
+                    failed.append(os.path.relpath(path, self.root))
+                    continue
+                if stat.S_ISREG(file_stat.st_mode):
+                    stats[os.path.relpath(path, self.root)] = [file_stat.st_size, file_stat.st_mtime_ns]
+
+        changed = [path for path, file_stat in stats.items()
+                   if self.manifest.get(path, [None, None])[:2] != file_stat]
+        # Files of unreadable directories are not removed, they are only failed to check
+        removed = [path for path in self.manifest if path not in stats
+                   and not any(path == failed_path or path.startswith(failed_path + os.sep)
+                               for failed_path in failed)]
+        return changed, removed, failed, stats
+
+    def close(self):
+        """
+        Shutting down worker processes
+        :return: None
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def sign_changed(self):
+        """
+        Signing only files changed since last run and updating manifest.
+        Files that can't be read (e.g. removed after scan) are skipped
+        and dropped from manifest, so they are signed on next run
+        :return: list of signed files, list of removed files
+            and list of failed files (relative paths)
+        """
+        changed, removed, failed, stats = self.scan()
+        for path in removed + failed:
+            if self.manifest.pop(path, None) is not None:
+                self._is_manifest_changed = True
+
+        signed = []
+        futures = dict()
+        try:
+            if changed:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(self.workers)
+                for path in changed:
+                    futures[path] = self._executor.submit(_sign_file, self.encryption.keys,
+                                                          os.path.join(self.root, path))
+            for path, future in futures.items():
+                try:
+                    self.manifest[path] = stats[path] + [future.result()]
+                    signed.append(path)
+                except OSError:
+                    self.manifest.pop(path, None)
+                    failed.append(path)
+                self._is_manifest_changed = True
+        finally:
+            # Signatures made before error are saved, other files are signed on next run
+            for future in futures.values():
+                future.cancel()
+            if self._is_manifest_changed:
+                self.save_manifest()
+        return signed, removed, failed
+
+    def watch(self, interval=1.0):
+        """
+        Re-signing changed files of tree every interval seconds until interrupted.
+        Changes are found only by polling stats of all files of tree, there is no inotify support,
+        so every scan takes time proportional to size of tree
+        :param interval: seconds between scans of tree
+        :return: None
+        """
+        try:
+            while True:
+                try:
+                    signed, removed, failed = self.sign_changed()
+                except Exception as error:
+                    # Worker pool may be broken, so it's created again on next run
+                    print('Signing failed: ' + str(error))
+                    self.close()
+                else:
+                    for path in signed:
+                        print('Signed: ' + path)
+                    for path in removed:
+                        print('Removed: ' + path)
+                    for path in failed:
+                        print('Failed: ' + path)
+                time.sleep(interval)
+        finally:
+            self.close()
+
+
+if __name__ == '__main__':
+    # Signing directory tree: tree_signer.py <root> <manifest> [key file]
+    # Keys are stored next to manifest by default, so manifest is reused between runs
+    key_file = sys.argv[3] if len(sys.argv) > 3 else sys.argv[2] + '.keys'
+    try:
+        TreeSigner(load_keys(key_file), sys.argv[1], sys.argv[2], key_path=key_file).watch()
+    except KeyboardInterrupt:
+        pass